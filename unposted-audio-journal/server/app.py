@@ -1,20 +1,118 @@
+import os
+
+# Size math thread pools per worker before torch, ONNX Runtime, CTranslate2
+# and Numba start, so co-scheduled workers don't oversubscribe the CPU
+NUM_WORKERS = max(1, int(os.environ.get("WEB_CONCURRENCY", "1")))
+THREADS_PER_WORKER = str(max(1, (os.cpu_count() or 1) // NUM_WORKERS))
+os.environ.setdefault("OMP_NUM_THREADS", THREADS_PER_WORKER)
+os.environ.setdefault("NUMBA_NUM_THREADS", THREADS_PER_WORKER)
+
 from flask import Flask, request, jsonify, render_template
 from flask_cors import CORS
-import os
+from asgiref.wsgi import WsgiToAsgi
+from concurrent.futures import ThreadPoolExecutor
+import multiprocessing
+import numpy as np
+import torch
 from datetime import datetime
-from models.speech_to_text import transcribe_audio, SUPPORTED_LANGUAGES
-from models.insights import generate_insights
-from models.emotion import analyze_emotion, analyze_prosody, generate_follow_up
-from utils.file_manager import save_audio, cleanup_old_files
+from faster_whisper import download_model as download_whisper_model
+from huggingface_hub import snapshot_download
+from models.speech_to_text import (
+    transcribe_audio,
+    SUPPORTED_LANGUAGES,
+    WHISPER_MODEL_SIZE,
+    _load_whisper_model,
+)
+from models.insights import generate_insights, LANGUAGE_CONFIGS, _get_summarizer
+from models.emotion import (
+    analyze_emotion,
+    analyze_emotion_batch,
+    analyze_prosody,
+    generate_follow_up,
+    SENTIMENT_MODEL,
+    LLM_MODEL,
+    _export_sentiment_model,
+    _load_sentiment_model,
+    _load_llm_models,
+)
+from utils.lang import _load_lid_model
+from utils.file_manager import decode_audio, cleanup_old_files_in_background
 
 app = Flask(__name__)
 CORS(app)
 
+# ASGI entry point: WEB_CONCURRENCY=N uvicorn app:asgi_app
+# WsgiToAsgi runs the Flask app on a single thread per process, so each
+# uvicorn worker still handles one /api/process at a time; only the worker
+# count adds request concurrency
+asgi_app = WsgiToAsgi(app)
+
+# Independent model steps run concurrently; torch/librosa release the GIL
+executor = ThreadPoolExecutor(max_workers=3)
+
+# Uploads are not saved here anymore; this folder only holds recordings saved by
+# earlier versions of the app
 UPLOAD_FOLDER = "uploads"
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
-# Clean up files older than 24 hours on startup
-cleanup_old_files(UPLOAD_FOLDER, hours=24)
+# Split CPU threads across Gunicorn workers to avoid intra/inter-op contention
+torch.set_num_threads(int(os.environ["OMP_NUM_THREADS"]))
+torch.set_num_interop_threads(1)
+
+# Sweep legacy recordings older than 24 hours on startup
+if os.path.isdir(UPLOAD_FOLDER):
+    cleanup_old_files_in_background(UPLOAD_FOLDER, hours=24)
+
+# Weights for other frameworks that the CPU PyTorch pipelines never load
+HF_IGNORE_PATTERNS = ["*.h5", "*.msgpack", "*.ot", "*.onnx", "*.tflite", "*.mlmodel"]
+
+def _export_sentiment_model_isolated():
+    """
+    Run the ONNX export in a spawned process, so torch and ONNX Runtime never
+    start in the caller (the Gunicorn master must stay free of thread pools).
+    """
+    process = multiprocessing.get_context("spawn").Process(target=_export_sentiment_model)
+    process.start()
+    process.join()
+    if process.exitcode != 0:
+        raise RuntimeError(f"ONNX export exited with code {process.exitcode}")
+
+def prefetch_models():
+    """
+    Download all model weights and build the ONNX sentiment export, without
+    starting any inference runtime. Under Gunicorn this runs once in the master
+    before workers fork, so workers only build models from the local cache.
+    Failures are logged; the affected model is then fetched lazily on first use.
+    """
+    steps = [("Whisper", lambda: download_whisper_model(WHISPER_MODEL_SIZE))]
+    hub_models = [SENTIMENT_MODEL, LLM_MODEL] + [config["model"] for config in LANGUAGE_CONFIGS.values()]
+    for repo_id in hub_models:
+        steps.append((repo_id, lambda repo_id=repo_id: snapshot_download(repo_id, ignore_patterns=HF_IGNORE_PATTERNS)))
+    steps.append(("sentiment ONNX export", _export_sentiment_model_isolated))
+
+    for name, step in steps:
+        try:
+            step()
+        except Exception as e:
+            print(f"Failed to prefetch {name}, it will be loaded on first use: {e}")
+
+def preload_shared_models():
+    """
+    Load the models that are safe to share across fork(). Under
+    `gunicorn --preload` this runs in the master, so workers share the
+    fastText weights copy-on-write. fastText keeps no thread pool.
+    """
+    _load_lid_model()
+
+def preload_models():
+    """
+    Load the native-runtime models (CTranslate2 Whisper, ONNX Runtime
+    sentiment, torch T5 and summarizer). Their thread pools do not survive
+    fork(), so under Gunicorn this runs in each worker after fork.
+    """
+    _load_whisper_model()
+    _load_sentiment_model()
+    _load_llm_models()
+    _get_summarizer("en")
 
 @app.route('/api/languages', methods=['GET'])
 def get_languages():
@@ -28,30 +126,42 @@ def process_audio():
             return jsonify(error="No audio file provided"), 400
         
         audio_file = request.files['audio']
-        filepath = save_audio(audio_file)
         
         language_code = request.form.get('language', 'auto')
         topic = request.form.get('topic', '')
 
+        # Decode the upload in memory at 16 kHz and share the samples across models
+        audio = decode_audio(audio_file)
+
         # Transcribe audio
-        transcript = transcribe_audio(filepath, language_code)
+        transcript = transcribe_audio(audio, language_code)
         
-        # Generate insights
-        insights = generate_insights(transcript, language=language_code if language_code != 'auto' else None)
+        # Generate insights while analyzing emotion and prosody
+        insights_future = executor.submit(
+            generate_insights,
+            transcript,
+            language=language_code if language_code != 'auto' else None,
+        )
+        valence_future = executor.submit(analyze_emotion, transcript)
+        arousal_future = executor.submit(analyze_prosody, audio)
+        valence = valence_future.result()
+        arousal = arousal_future.result()
 
-        # Analyze emotions and prosody
-        valence = analyze_emotion(transcript)
-        arousal = analyze_prosody(filepath)
-        followup = generate_follow_up(transcript, valence, arousal)
+        # Follow-up only needs the emotions, so it overlaps with insight scoring
+        followup_future = executor.submit(generate_follow_up, transcript, valence, arousal)
+        insights = insights_future.result()
+        insight_scores = analyze_emotion_batch(insights)
+        followup = followup_future.result()
 
         # Prepare emotion summary for UI
         emotion_summary = get_emotion_summary(valence, arousal)
 
         # Prepare bullet types for insights
-        result_bullets = []
-        for insight in insights:
-            bullet_type = get_bullet_type(insight, valence)
-            result_bullets.append({"text": insight, "type": bullet_type})
+        bullet_types = get_bullet_types(insight_scores)
+        result_bullets = [
+            {"text": insight, "type": bullet_type}
+            for insight, bullet_type in zip(insights, bullet_types)
+        ]
 
         result = {
             "transcript": transcript,
@@ -72,39 +182,39 @@ def process_audio():
         print("Error:", e)
         return jsonify(error=str(e)), 500
 
+# Emotion summaries indexed by [valence bin][arousal bin]; bins are
+# 0 (< -0.3), 1 (neutral), 2 (> 0.3)
+_EMO_TABLE = np.array([
+    [
+        "You're expressing some heavy emotions calmly.",
+        "You're processing some challenging feelings.",
+        "There's intensity and concern in your voice.",
+    ],
+    [
+        "Your tone is thoughtful and measured.",
+        "You're expressing yourself in a balanced way.",
+        "You're speaking with energy and engagement.",
+    ],
+    [
+        "You seem content and peaceful.",
+        "You're expressing positive feelings in a balanced way.",
+        "Your reflection shows excitement and positivity.",
+    ],
+])
+_BULLET_TYPES = np.array(["negative", "neutral", "positive"])
+
+def _sign_bin(x):
+    """Quantize score(s) into 0 (below -0.3), 1 (neutral) or 2 (above 0.3)."""
+    x = np.asarray(x, dtype=float)
+    return (x > 0.3).astype(int) - (x < -0.3).astype(int) + 1
+
 def get_emotion_summary(valence, arousal):
     """Generate a human-readable summary of the emotional state."""
-    if valence > 0.3:
-        if arousal > 0.3:
-            return "Your reflection shows excitement and positivity."
-        elif arousal < -0.3:
-            return "You seem content and peaceful."
-        else:
-            return "You're expressing positive feelings in a balanced way."
-    elif valence < -0.3:
-        if arousal > 0.3:
-            return "There's intensity and concern in your voice."
-        elif arousal < -0.3:
-            return "You're expressing some heavy emotions calmly."
-        else:
-            return "You're processing some challenging feelings."
-    else:
-        if arousal > 0.3:
-            return "You're speaking with energy and engagement."
-        elif arousal < -0.3:
-            return "Your tone is thoughtful and measured."
-        else:
-            return "You're expressing yourself in a balanced way."
-
-def get_bullet_type(insight, valence):
-    """Determine the type of insight bullet: positive, negative, or neutral."""
-    insight_sentiment = analyze_emotion(insight)
-    if insight_sentiment > 0.3:
-        return "positive"
-    elif insight_sentiment < -0.3:
-        return "negative"
-    else:
-        return "neutral"
+    return str(_EMO_TABLE[_sign_bin(valence), _sign_bin(arousal)])
+
+def get_bullet_types(insight_scores):
+    """Determine the type of each insight bullet: positive, negative, or neutral."""
+    return _BULLET_TYPES[_sign_bin(insight_scores)].tolist()
 
 if __name__ == "__main__":
     app.run(debug=True, host="0.0.0.0", port=3000)
@@ -0,0 +1,34 @@
+import os
+
+bind = "0.0.0.0:3000"
+workers = max(1, int(os.environ.get("WEB_CONCURRENCY", "1")))
+timeout = 300  # Model inference can take tens of seconds per request
+
+# Import the app in the master so workers share the imported modules and the
+# fork-safe fastText model copy-on-write
+preload_app = True
+
+def on_starting(server):
+    """
+    Download weights and build the ONNX export once in the master, then load
+    the fork-safe models. The master has no worker timeout, so slow first-run
+    downloads cannot get workers killed.
+    """
+    from app import prefetch_models, preload_shared_models
+    prefetch_models()
+    try:
+        preload_shared_models()
+    except Exception as e:
+        server.log.warning("Failed to preload shared models, loading lazily: %s", e)
+
+def post_fork(server, worker):
+    """
+    Build native-runtime models from the local cache in each worker; their
+    thread pools do not survive fork(). A failure here must not stop the
+    worker from booting, so it falls back to lazy loading on first request.
+    """
+    from app import preload_models
+    try:
+        preload_models()
+    except Exception as e:
+        server.log.warning("Failed to preload models in worker %s, loading lazily: %s", worker.pid, e)
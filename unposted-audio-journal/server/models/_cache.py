@@ -0,0 +1,96 @@
+"""
+In-memory caches for model outputs.
+An exact-match LRU cache for sentiment scores and a similarity cache for
+generated follow-up questions.
+"""
+
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Hashable, Optional
+import numpy as np
+
+EMBEDDING_DIM = 1024
+NGRAM_SIZE = 3
+
+
+class LRUCache:
+    """
+    Thread-safe exact-match LRU cache.
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable):
+        """Return the cached value for key, or None on a miss."""
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key: Hashable, value) -> None:
+        """Store a value, evicting the least recently used entry when full."""
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+
+def _embed(text: str) -> np.ndarray:
+    """
+    Cheap hashed character n-gram embedding, L2-normalized.
+    """
+    vector = np.zeros(EMBEDDING_DIM, dtype=np.float32)
+    text = text.lower()
+    for i in range(max(1, len(text) - NGRAM_SIZE + 1)):
+        ngram = text[i:i + NGRAM_SIZE].encode("utf-8")
+        vector[zlib.crc32(ngram) % EMBEDDING_DIM] += 1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+class SemanticCache:
+    """
+    Thread-safe similarity cache over texts.
+    Entries are partitioned by an exact key (e.g. language and emotion bucket)
+    and looked up by cosine similarity of hashed n-gram embeddings. Embed only
+    the varying input, not a shared prompt template, or unrelated texts will
+    look similar.
+    """
+
+    def __init__(self, maxsize: int = 256, threshold: float = 0.85):
+        self.maxsize = maxsize
+        self.threshold = threshold
+        self._embeddings = np.zeros((maxsize, EMBEDDING_DIM), dtype=np.float32)
+        self._keys = [None] * maxsize
+        self._values = [None] * maxsize
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, text: str) -> Optional[str]:
+        """Return the cached output of the most similar text under key, or None."""
+        embedding = _embed(text)
+        with self._lock:
+            similarities = self._embeddings @ embedding
+            for i, slot_key in enumerate(self._keys):
+                if slot_key != key:
+                    similarities[i] = -1.0
+            best = int(similarities.argmax())
+            if similarities[best] > self.threshold:
+                return self._values[best]
+        return None
+
+    def put(self, key: Hashable, text: str, value: str) -> None:
+        """Store an output, overwriting the oldest entry when full."""
+        embedding = _embed(text)
+        with self._lock:
+            slot = self._next
+            self._embeddings[slot] = embedding
+            self._keys[slot] = key
+            self._values[slot] = value
+            self._next = (slot + 1) % self.maxsize
@@ -0,0 +1,124 @@
+"""
+Numba-accelerated prosody features (energy and pitch) for prosody analysis.
+Computes RMS energy and an FFT-based autocorrelation pitch estimate in a
+single pass over the framed waveform.
+"""
+
+import numpy as np
+from numba import config, njit, prange
+
+# The kernel is called from request threads concurrently. Numba's fallback
+# "workqueue" layer aborts on concurrent use, so require a thread-safe layer
+# (TBB or OpenMP).
+config.THREADING_LAYER = "safe"
+
+FRAME_LENGTH = 2048
+HOP_LENGTH = 512
+FRAMES_PER_CHUNK = 256  # Bounds the size of the per-chunk FFT buffers
+VOICING_THRESHOLD = 0.3  # Minimum normalized autocorrelation peak for a voiced frame
+
+
+@njit(parallel=True, fastmath=True, cache=True)
+def _frame_features(acf, sr, frame, min_lag, max_lag):
+    """
+    Compute RMS energy and pitch per frame from its autocorrelation.
+    The zero-lag autocorrelation is the frame's sum of squares, so RMS falls
+    out of the same buffer used for pitch picking.
+
+    Args:
+        acf (np.ndarray): Autocorrelation per frame, shape (n_frames, n_lags).
+        sr (float): Sample rate of the audio.
+        frame (int): Frame length in samples.
+        min_lag (int): Smallest lag to consider (highest pitch).
+        max_lag (int): Largest lag to consider (lowest pitch).
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: RMS per frame, and pitch in Hz per
+            frame (NaN for unvoiced/silent frames).
+    """
+    n_frames = acf.shape[0]
+    rms = np.empty(n_frames)
+    pitch = np.empty(n_frames)
+    for i in prange(n_frames):
+        energy = acf[i, 0]
+        if energy <= 0.0:
+            rms[i] = 0.0
+            pitch[i] = np.nan
+            continue
+        rms[i] = np.sqrt(energy / frame)
+        # Skip the zero-lag main lobe: start after its first zero-crossing or
+        # local minimum, otherwise low voices snap to the min_lag bound
+        start = min_lag
+        while start < max_lag and acf[i, start] > 0.0 and acf[i, start + 1] < acf[i, start]:
+            start += 1
+        best_lag = start
+        best_val = acf[i, start]
+        for lag in range(start + 1, max_lag + 1):
+            if acf[i, lag] > best_val:
+                best_val = acf[i, lag]
+                best_lag = lag
+        if best_val / energy < VOICING_THRESHOLD:
+            pitch[i] = np.nan
+        else:
+            pitch[i] = sr / best_lag
+    return rms, pitch
+
+
+def _autocorrelation(frames: np.ndarray) -> np.ndarray:
+    """Autocorrelation of each frame via the Wiener-Khinchin theorem (zero-padded FFT)."""
+    n_fft = 2 * frames.shape[1]
+    spectrum = np.fft.rfft(frames, n=n_fft, axis=1)
+    return np.fft.irfft(spectrum.real ** 2 + spectrum.imag ** 2, n=n_fft, axis=1)
+
+
+def prosody_features(
+    y: np.ndarray,
+    sr: float,
+    fmin_hz: float,
+    fmax_hz: float,
+    frame: int = FRAME_LENGTH,
+    hop: int = HOP_LENGTH,
+) -> tuple[float, float]:
+    """
+    Estimate mean RMS energy and mean fundamental frequency of a signal
+    in one pass over its frames.
+
+    Args:
+        y (np.ndarray): Mono audio signal.
+        sr (float): Sample rate of the audio.
+        fmin_hz (float): Lowest pitch to consider.
+        fmax_hz (float): Highest pitch to consider.
+        frame (int): Frame length in samples.
+        hop (int): Hop length in samples.
+
+    Returns:
+        tuple[float, float]: Mean RMS energy, and mean pitch in Hz over
+            voiced frames (NaN if no frame is voiced).
+    """
+    min_lag = max(1, int(sr / fmax_hz))
+    max_lag = min(frame - 1, int(np.ceil(sr / fmin_hz)))
+    if len(y) < frame or min_lag >= max_lag:
+        energy = float(np.sqrt(np.mean(np.square(y)))) if len(y) > 0 else 0.0
+        return energy, np.nan
+
+    frames = np.lib.stride_tricks.sliding_window_view(y, frame)[::hop]
+    rms_total = 0.0
+    pitch_total = 0.0
+    voiced_count = 0
+    for start in range(0, len(frames), FRAMES_PER_CHUNK):
+        acf = _autocorrelation(frames[start:start + FRAMES_PER_CHUNK])
+        rms, pitch = _frame_features(acf, float(sr), frame, min_lag, max_lag)
+        rms_total += rms.sum()
+        voiced = pitch[~np.isnan(pitch)]
+        pitch_total += voiced.sum()
+        voiced_count += len(voiced)
+
+    energy = rms_total / len(frames)
+    pitch_mean = pitch_total / voiced_count if voiced_count else np.nan
+    return energy, pitch_mean
+
+
+# Compile once at import so the JIT cost is not paid by the first request.
+# Compiling (rather than calling) avoids starting Numba's parallel thread pool,
+# which would not survive a Gunicorn fork.
+_frame_features.compile("(float64[:, ::1], float64, int64, int64, int64)")
@@ -3,74 +3,186 @@ Emotion analysis module for journal entries.
 Analyzes emotional content, prosodic features, and generates follow-up questions.
 """
 
-import warnings
-from typing import Optional
+import fcntl
+import os
+import shutil
+import tempfile
+import threading
+from typing import Optional, Union
 import numpy as np
 import librosa
-from langdetect import detect, LangDetectException
+import onnxruntime as ort
+import torch
+from optimum.onnxruntime import ORTModelForSequenceClassification, ORTQuantizer
+from optimum.onnxruntime.configuration import AutoQuantizationConfig
 from transformers import (
-    pipeline,
+    AutoConfig,
     AutoTokenizer,
     T5ForConditionalGeneration,
 )
+from models._cache import LRUCache, SemanticCache
+from models._prosody_numba import prosody_features
+from utils.file_manager import load_audio, SAMPLE_RATE
+from utils.lang import detect_language, SUPPORTED_LANGUAGES
 
 # Constants
-SUPPORTED_LANGUAGES = {"en": "English", "hi": "Hindi"}
 SENTIMENT_MODEL = "nlptown/bert-base-multilingual-uncased-sentiment"
+SENTIMENT_ONNX_DIR = os.path.join(os.path.dirname(__file__), "onnx", "sentiment")
+SENTIMENT_ONNX_FILE = "model_quantized.onnx"
 LLM_MODEL = "google/flan-t5-base"
+FOLLOW_UP_MAX_NEW_TOKENS = 32
+FOLLOW_UP_MIN_TEXT_LENGTH = 120  # Shorter entries get a fallback question
 TEXT_MAX_LENGTH = 512  # FIX: This is used for text truncation
 VALENCE_THRESHOLD = 0.3
 AROUSAL_THRESHOLD = 0.3
 ENERGY_NORMALIZATION = {"min": 0.02, "range": 0.05}
-TEMPO_NORMALIZATION = {"center": 90, "range": 60}
 PITCH_NORMALIZATION = {"center": 160, "range": 100}
 
+# Prosody feature normalization as vectors over (energy, pitch)
+_PROSODY_CENTERS = np.array([
+    ENERGY_NORMALIZATION["min"],
+    PITCH_NORMALIZATION["center"],
+])
+_PROSODY_RANGES = np.array([
+    ENERGY_NORMALIZATION["range"],
+    PITCH_NORMALIZATION["range"],
+])
+_PROSODY_WEIGHTS = np.array([0.7, 0.3])
+
 # Global model instances (lazy-loaded)
 _sentiment_analyzer = None
 _generator_tokenizer = None
 _generator_model = None
+_sentiment_lock = threading.Lock()
+_llm_lock = threading.Lock()
+
+# Output caches: exact match for sentiment, entry-text similarity for follow-ups
+_sentiment_cache = LRUCache(maxsize=4096)
+_follow_up_cache = SemanticCache(maxsize=256, threshold=0.85)
+
+
+class _OnnxSentimentClassifier:
+    """
+    Minimal stand-in for the HF sentiment pipeline backed by an INT8 ONNX session.
+    Returns the same ``[{"label": ..., "score": ...}]`` structure.
+    """
+
+    def __init__(self, model_dir: str):
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.id2label = AutoConfig.from_pretrained(model_dir).id2label
+
+        sess_options = ort.SessionOptions()
+        sess_options.intra_op_num_threads = int(os.environ.get("OMP_NUM_THREADS", os.cpu_count() or 1))
+        sess_options.inter_op_num_threads = 1
+        sess_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL  # Fuses LayerNorm/GELU/attention
+        self.session = ort.InferenceSession(
+            os.path.join(model_dir, SENTIMENT_ONNX_FILE),
+            sess_options,
+            providers=["CPUExecutionProvider"],
+        )
+        self.input_names = {node.name for node in self.session.get_inputs()}
+
+    def __call__(self, text: Union[str, list[str]]) -> list[dict]:
+        inputs = self.tokenizer(
+            text,
+            padding=True,
+            truncation=True,
+            max_length=TEXT_MAX_LENGTH,
+            return_tensors="np",
+        )
+        feed = {
+            name: value.astype(np.int64)
+            for name, value in inputs.items()
+            if name in self.input_names
+        }
+        logits = self.session.run(None, feed)[0]
+
+        # Softmax over classes, same as the pipeline's post-processing
+        logits = logits - logits.max(axis=-1, keepdims=True)
+        probs = np.exp(logits)
+        probs /= probs.sum(axis=-1, keepdims=True)
+
+        results = []
+        for row in probs:
+            idx = int(row.argmax())
+            results.append({"label": self.id2label[idx], "score": float(row[idx])})
+        return results
+
+
+def _export_sentiment_model() -> str:
+    """
+    Export the sentiment model to ONNX and quantize it to INT8 (once, cached on disk).
+    A file lock serializes the export across worker processes, and the export is
+    built in a temporary directory and moved into place, so an interrupted export
+    never leaves a directory that looks complete.
+    """
+    quantized_path = os.path.join(SENTIMENT_ONNX_DIR, SENTIMENT_ONNX_FILE)
+    if os.path.exists(quantized_path):
+        return SENTIMENT_ONNX_DIR
+
+    parent_dir = os.path.dirname(SENTIMENT_ONNX_DIR)
+    os.makedirs(parent_dir, exist_ok=True)
+    with open(os.path.join(parent_dir, ".sentiment.lock"), "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            # Another process may have finished the export while we waited
+            if os.path.exists(quantized_path):
+                return SENTIMENT_ONNX_DIR
+
+            print("Exporting sentiment model to ONNX...")
+            tmp_dir = tempfile.mkdtemp(prefix=".sentiment-", dir=parent_dir)
+            try:
+                ort_model = ORTModelForSequenceClassification.from_pretrained(
+                    SENTIMENT_MODEL, export=True
+                )
+                ort_model.save_pretrained(tmp_dir)
+                AutoTokenizer.from_pretrained(SENTIMENT_MODEL).save_pretrained(tmp_dir)
+
+                quantizer = ORTQuantizer.from_pretrained(ort_model)
+                qconfig = AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=False)
+                quantizer.quantize(save_dir=tmp_dir, quantization_config=qconfig)
+
+                # Under the lock, a directory without the quantized model can only
+                # be an incomplete export left behind by an older version
+                if os.path.isdir(SENTIMENT_ONNX_DIR) and not os.path.exists(quantized_path):
+                    shutil.rmtree(SENTIMENT_ONNX_DIR, ignore_errors=True)
+                try:
+                    os.replace(tmp_dir, SENTIMENT_ONNX_DIR)
+                except OSError:
+                    # Lost the race to a complete export; keep that one
+                    if not os.path.exists(quantized_path):
+                        raise
+            finally:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+    return SENTIMENT_ONNX_DIR
 
 
 def _load_sentiment_model():
-    """Lazily load the sentiment analysis model."""
+    """Lazily load the INT8 ONNX Runtime sentiment model."""
     global _sentiment_analyzer
-    if _sentiment_analyzer is None:
-        print("Loading sentiment model...")
-        _sentiment_analyzer = pipeline(
-            "sentiment-analysis",
-            model=SENTIMENT_MODEL,
-            device=-1,  # Use CPU
-        )
+    with _sentiment_lock:
+        if _sentiment_analyzer is None:
+            print("Loading sentiment model...")
+            _sentiment_analyzer = _OnnxSentimentClassifier(_export_sentiment_model())
     return _sentiment_analyzer
 
 
 def _load_llm_models():
     """Lazily load the LLM models for follow-up generation."""
     global _generator_tokenizer, _generator_model
-    if _generator_tokenizer is None or _generator_model is None:
-        print("Loading LLM for follow-up generation...")
-        _generator_tokenizer = AutoTokenizer.from_pretrained(LLM_MODEL)
-        _generator_model = T5ForConditionalGeneration.from_pretrained(LLM_MODEL)
-
-
-def detect_language(text: str) -> str:
-    """
-    Detect the language of the text with fallback to English.
-    
-    Args:
-        text (str): Input text to analyze.
-    
-    Returns:
-        str: Language code ('en', 'hi') or 'en' as default.
-    """
-    if not text or not isinstance(text, str):
-        return "en"
-    
-    try:
-        lang = detect(text)
-        return lang if lang in SUPPORTED_LANGUAGES else "en"
-    except (LangDetectException, Exception):
-        return "en"
+    with _llm_lock:
+        if _generator_tokenizer is None or _generator_model is None:
+            print("Loading LLM for follow-up generation...")
+            tokenizer = AutoTokenizer.from_pretrained(LLM_MODEL)
+            model = T5ForConditionalGeneration.from_pretrained(LLM_MODEL)
+            # INT8 dynamic quantization of the dense layers for faster CPU decoding
+            model = torch.quantization.quantize_dynamic(
+                model, {torch.nn.Linear}, dtype=torch.qint8
+            )
+            model.eval()
+            _generator_tokenizer, _generator_model = tokenizer, model
 
 
 def analyze_emotion(text: str, language: Optional[str] = None) -> float:
@@ -91,13 +203,46 @@ def analyze_emotion(text: str, language: Optional[str] = None) -> float:
     if language is None or language not in SUPPORTED_LANGUAGES:
         language = detect_language(text)
     
+    return analyze_emotion_batch([text])[0]
+
+
+def analyze_emotion_batch(texts: list[str]) -> list[float]:
+    """
+    Analyze the emotional content of several texts in a single batched forward pass.
+    
+    Args:
+        texts (list[str]): Input texts to analyze.
+    
+    Returns:
+        list[float]: Sentiment scores between -1 (negative) and 1 (positive),
+            in the same order as ``texts``. Empty or invalid texts score 0.0.
+    """
+    scores = [0.0] * len(texts)
+    
     # Truncate text to avoid model limits - FIX: Use TEXT_MAX_LENGTH (integer)
-    text_truncated = text[:TEXT_MAX_LENGTH]
+    # and only send cache misses to the model
+    misses = []
+    for i, text in enumerate(texts):
+        if not text or not isinstance(text, str):
+            continue
+        cached = _sentiment_cache.get(text[:TEXT_MAX_LENGTH])
+        if cached is None:
+            misses.append(i)
+        else:
+            scores[i] = cached
+    if not misses:
+        return scores
+    
+    batch = [texts[i][:TEXT_MAX_LENGTH] for i in misses]
     
     try:
         sentiment_analyzer = _load_sentiment_model()
-        result = sentiment_analyzer(text_truncated)[0]
-        
+        results = sentiment_analyzer(batch)
+    except Exception as e:
+        print(f"Error in emotion analysis: {e}")
+        return scores
+    
+    for i, text_truncated, result in zip(misses, batch, results):
         # Extract score and normalize
         score = float(result.get("score", 0.0))
         label = result.get("label", "").upper()
@@ -107,20 +252,21 @@ def analyze_emotion(text: str, language: Optional[str] = None) -> float:
             score = -score
         
         # Clamp to [-1, 1] range
-        return max(min(score, 1.0), -1.0)
+        scores[i] = max(min(score, 1.0), -1.0)
+        _sentiment_cache.put(text_truncated, scores[i])
     
-    except Exception as e:
-        print(f"Error in emotion analysis: {e}")
-        return 0.0
+    return scores
 
 
-def analyze_prosody(audio_path: str) -> float:
+def analyze_prosody(audio: Union[str, np.ndarray], sr: int = SAMPLE_RATE) -> float:
     """
-    Analyze prosodic features of speech (energy, tempo, pitch).
+    Analyze prosodic features of speech (energy, pitch).
     Language-agnostic as it analyzes acoustic properties.
     
     Args:
-        audio_path (str): Path to the audio file.
+        audio (Union[str, np.ndarray]): Path to the audio file, or already
+            decoded mono samples.
+        sr (int): Sample rate of ``audio`` when passing samples.
     
     Returns:
         float: Arousal score between -1 (calm) and 1 (excited).
@@ -128,59 +274,36 @@ def analyze_prosody(audio_path: str) -> float:
     Raises:
         ValueError: If audio file cannot be loaded.
     """
-    import os
-    
-    if not os.path.exists(audio_path):
-        raise ValueError(f"Audio file not found: {audio_path}")
+    if isinstance(audio, str) and not os.path.exists(audio):
+        raise ValueError(f"Audio file not found: {audio}")
     
     try:
-        # Load audio file
-        with warnings.catch_warnings():
-            warnings.simplefilter("ignore")
-            y, sr = librosa.load(audio_path, sr=None)
+        # Load audio file at 16 kHz mono unless samples were passed in
+        if isinstance(audio, str):
+            y, sr = load_audio(audio), SAMPLE_RATE
+        else:
+            y = audio
         
         if len(y) == 0:
             raise ValueError("Audio file is empty or invalid")
         
-        # Extract prosodic features
-        energy = np.mean(librosa.feature.rms(y=y)[0]) if len(y) > 0 else 0.0
-        
-        # Calculate tempo safely
-        try:
-            tempo, _ = librosa.beat.beat_track(y=y, sr=sr)
-        except Exception:
-            tempo = TEMPO_NORMALIZATION["center"]  # Fallback to neutral tempo
-        
-        # Calculate pitch safely
+        # Extract energy and pitch in a single pass over the waveform
         try:
-            pitch_values = librosa.yin(
+            energy, pitch_mean = prosody_features(
                 y,
-                fmin=librosa.note_to_hz("C2"),
-                fmax=librosa.note_to_hz("C7"),
+                sr,
+                fmin_hz=librosa.note_to_hz("C2"),
+                fmax_hz=librosa.note_to_hz("C7"),
             )
-            pitch_mean = np.nanmean(pitch_values) if len(pitch_values) > 0 else PITCH_NORMALIZATION["center"]
         except Exception:
+            energy, pitch_mean = np.mean(librosa.feature.rms(y=y)[0]), np.nan
+        if not np.isfinite(pitch_mean):
             pitch_mean = PITCH_NORMALIZATION["center"]  # Fallback to neutral pitch
         
-        # Normalize features to [-1, 1] range
-        energy_score = _normalize_score(
-            energy,
-            ENERGY_NORMALIZATION["min"],
-            ENERGY_NORMALIZATION["range"],
-        )
-        tempo_score = _normalize_score(
-            tempo,
-            TEMPO_NORMALIZATION["center"],
-            TEMPO_NORMALIZATION["range"],
-        )
-        pitch_score = _normalize_score(
-            pitch_mean,
-            PITCH_NORMALIZATION["center"],
-            PITCH_NORMALIZATION["range"],
-        )
-        
-        # Weighted combination of features
-        arousal = 0.5 * energy_score + 0.3 * tempo_score + 0.2 * pitch_score
+        # Normalize features to [-1, 1] range and take the weighted combination
+        features = np.array([energy, pitch_mean], dtype=float)
+        scores = np.clip((features - _PROSODY_CENTERS) / _PROSODY_RANGES, -1.0, 1.0)
+        arousal = float(_PROSODY_WEIGHTS @ scores)
         
         return max(min(arousal, 1.0), -1.0)
     
@@ -189,24 +312,6 @@ def analyze_prosody(audio_path: str) -> float:
         return 0.0
 
 
-def _normalize_score(value: float, center: float, range_val: float) -> float:
-    """
-    Normalize a score to [-1, 1] range using min-max normalization.
-    
-    Args:
-        value (float): Value to normalize.
-        center (float): Center/expected value.
-        range_val (float): Range around center.
-    
-    Returns:
-        float: Normalized score in [-1, 1].
-    """
-    if range_val == 0:
-        return 0.0
-    normalized = (value - center) / range_val
-    return max(min(normalized, 1.0), -1.0)
-
-
 def _get_emotion_context(valence: float, arousal: float) -> str:
     """
     Generate emotional context description.
@@ -261,6 +366,10 @@ def generate_follow_up(
     if language is None or language not in SUPPORTED_LANGUAGES:
         language = detect_language(text)
     
+    # Short entries: T5 adds nothing over the hand-written questions
+    if len(text) < FOLLOW_UP_MIN_TEXT_LENGTH:
+        return _get_fallback_question(language, valence)
+    
     # Get emotion context
     emotion_context = _get_emotion_context(valence, arousal)
     
@@ -278,6 +387,12 @@ def generate_follow_up(
             f"Emotion: {emotion_context}. Text: {text_sample}..."
         )
     
+    # Reuse the answer for a near-identical entry in the same language and emotional bucket
+    cache_key = (language, emotion_context)
+    cached = _follow_up_cache.get(cache_key, text_sample)
+    if cached is not None:
+        return cached
+    
     try:
         _load_llm_models()
         
@@ -289,15 +404,14 @@ def generate_follow_up(
             truncation=True,
         )
         
-        outputs = _generator_model.generate(
-            inputs["input_ids"],
-            max_length=100,
-            num_return_sequences=1,
-            temperature=0.7,
-            do_sample=True,
-            top_k=50,
-            top_p=0.95,
-        )
+        # Greedy decoding; follow-up questions are short
+        with torch.inference_mode():
+            outputs = _generator_model.generate(
+                inputs["input_ids"],
+                max_new_tokens=FOLLOW_UP_MAX_NEW_TOKENS,
+                num_beams=1,
+                do_sample=False,
+            )
         
         generated_text = _generator_tokenizer.decode(
             outputs[0], skip_special_tokens=True
@@ -306,7 +420,11 @@ def generate_follow_up(
         # Clean up: take first line and remove artifacts
         question = generated_text.strip().split("\n")[0].strip()
         
-        return question if question else _get_fallback_question(language, valence)
+        if not question:
+            return _get_fallback_question(language, valence)
+        
+        _follow_up_cache.put(cache_key, text_sample, question)
+        return question
     
     except Exception as e:
         print(f"Error generating follow-up question: {e}")
@@ -1,6 +1,8 @@
 from transformers import pipeline
-from langdetect import detect
 import re
+import threading
+from typing import Optional
+from utils.lang import detect_language
 
 # Language-specific model configs and fallback prompts
 LANGUAGE_CONFIGS = {
@@ -22,42 +24,61 @@ LANGUAGE_CONFIGS = {
     }
 }
 
-# Initialize summarization pipelines for each language
-print("Loading summarizers...")
+SHORT_TEXT_LENGTH = 200  # Below this, insights are purely extractive
+SUMMARY_MIN_TEXT_LENGTH = 400  # Below this, the summarizer is skipped
+
+# Summarization pipelines, loaded on first use per language
 summarizers = {}
-for lang, config in LANGUAGE_CONFIGS.items():
-    summarizers[lang] = pipeline("summarization", model=config["model"], device=-1)  # CPU device
+_summarizer_lock = threading.Lock()
 
-def detect_language(text: str) -> str:
-    """
-    Detect language of the text with fallback to English.
-    """
-    try:
-        lang = detect(text)
-        if lang in LANGUAGE_CONFIGS:
-            return lang
-        else:
-            return "en"
-    except:
-        return "en"
-
-def clean_text(text: str) -> str:
+def _get_summarizer(language: str):
     """
-    Clean and normalize text for better sentence splitting.
-    Converts various punctuation marks to periods.
+    Lazily load the summarization pipeline for a language.
     """
-    text = re.sub(r"[।।?]", ".", text)
-    return text
+    with _summarizer_lock:
+        if language not in summarizers:
+            print(f"Loading summarizer for '{language}'...")
+            summarizers[language] = pipeline(
+                "summarization", model=LANGUAGE_CONFIGS[language]["model"], device=-1  # CPU device
+            )
+        return summarizers[language]
 
-def get_sentences(text: str, min_length: int = 20) -> list[str]:
+# Precompiled pattern matching the text between sentence terminators
+# (including the Devanagari danda)
+_SENT_RE = re.compile(r"[^.।?!]+")
+
+def get_sentences(text: str, min_length: int = 20, max_count: int = 3) -> list[str]:
     """
     Extract sentences from text with proper handling of different sentence endings.
-    Returns a list of sentences longer than min_length.
+    Returns up to max_count sentences longer than min_length, in a single pass.
     """
-    text = clean_text(text)
-    sentences = [s.strip() for s in re.split(r"\.\s*", text) if len(s.strip()) >= min_length]
+    sentences = []
+    for match in _SENT_RE.finditer(text):
+        sentence = match.group().strip()
+        if len(sentence) >= min_length:
+            sentences.append(sentence)
+            if len(sentences) == max_count:
+                break
     return sentences
 
+def extract_or_fallback(text: str, language: str, sentences: Optional[list[str]] = None) -> list[str]:
+    """
+    Build 3 insights from extracted sentences, padded with fallback prompts.
+    Never runs a summarizer.
+    """
+    config = LANGUAGE_CONFIGS[language]
+    if sentences is None:
+        sentences = get_sentences(text, 20)
+
+    insights = sentences[:3]
+
+    # Fill remaining slots with fallback prompts if needed
+    while len(insights) < 3:
+        prompt_index = len(insights) % len(config["fallback_prompts"])
+        insights.append(config["fallback_prompts"][prompt_index])
+
+    return insights
+
 def generate_insights(text: str, language: str = None) -> list[str]:
     """
     Generate 3 insights from text in specified language.
@@ -69,29 +90,27 @@ def generate_insights(text: str, language: str = None) -> list[str]:
     if language is None or language not in LANGUAGE_CONFIGS:
         language = detect_language(text)
 
-    summarizer = summarizers.get(language)
-    config = LANGUAGE_CONFIGS[language]
+    # Short entries: extraction alone is as good as a summary
+    if len(text) < SHORT_TEXT_LENGTH:
+        return extract_or_fallback(text, language)
 
     sentences = get_sentences(text, 20)
 
-    insights = []
     try:
-        if len(sentences) >= 3 and len(text) > 100:
-            summary_results = summarizer(text, max_length=100, min_length=30)
+        # Only summarize when extraction came up short and the text is long
+        # enough for the summarizer to add anything
+        if len(sentences) < 3 and len(text) > SUMMARY_MIN_TEXT_LENGTH:
+            summary_results = _get_summarizer(language)(
+                text,
+                max_length=100,
+                min_length=30,
+                truncation=True,
+            )
             summary_text = summary_results[0]["summary_text"]
-            sentences = get_sentences(summary_text, 20)
+            for sentence in get_sentences(summary_text, 20):
+                if len(sentences) < 3 and sentence not in sentences:
+                    sentences.append(sentence)
     except Exception as e:
         print("Summarization error:", e)
 
-    # Keep first 3 sentences or fallback prompts if not enough
-    while len(sentences) < 3 and len(text) >= 100:
-        sentences.append(config["fallback_prompts"][len(sentences) % len(config["fallback_prompts"])])
-
-    insights = sentences[:3]
-
-    # Fill remaining slots with fallback prompts if needed
-    while len(insights) < 3:
-        prompt_index = len(insights) % len(config["fallback_prompts"])
-        insights.append(config["fallback_prompts"][prompt_index])
-
-    return insights
+    return extract_or_fallback(text, language, sentences)
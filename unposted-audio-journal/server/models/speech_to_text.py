@@ -1,6 +1,10 @@
-import whisper
+from faster_whisper import WhisperModel
 import os
-from typing import Optional
+import threading
+import numpy as np
+from typing import Optional, Union
+
+WHISPER_MODEL_SIZE = "medium"
 
 SUPPORTED_LANGUAGES = {
     "en": "English",
@@ -8,15 +12,32 @@ SUPPORTED_LANGUAGES = {
     "auto": "Auto Detect"
 }
 
-print("Loading Whisper model...")
-model = whisper.load_model("medium", device="cpu")
+# Loaded on first use: CTranslate2 thread pools do not survive fork(), so the
+# model must be created in the process that runs inference
+model = None
+_model_lock = threading.Lock()
+
+def _load_whisper_model() -> WhisperModel:
+    """Lazily load the Whisper model."""
+    global model
+    with _model_lock:
+        if model is None:
+            print("Loading Whisper model...")
+            model = WhisperModel(
+                WHISPER_MODEL_SIZE,
+                device="cpu",
+                compute_type="int8",
+                cpu_threads=int(os.environ.get("OMP_NUM_THREADS", os.cpu_count() or 0)),
+            )
+    return model
 
-def transcribe_audio(filepath: str, language_code: Optional[str] = None) -> str:
+def transcribe_audio(audio: Union[str, np.ndarray], language_code: Optional[str] = None) -> str:
     """
     Transcribe audio file to text with language support.
     
     Args:
-        filepath (str): Path to the audio file.
+        audio (Union[str, np.ndarray]): Path to the audio file, or mono
+            float32 samples at 16 kHz.
         language_code (Optional[str]): Language code ('en', 'hi', or 'auto'). Defaults to None.
     
     Returns:
@@ -25,7 +46,7 @@ def transcribe_audio(filepath: str, language_code: Optional[str] = None) -> str:
     Raises:
         ValueError: If file not found, unsupported language, or transcription fails.
     """
-    if not os.path.exists(filepath):
+    if isinstance(audio, str) and not os.path.exists(audio):
         raise ValueError("Audio file not found")
 
     valid_languages = ", ".join(f"{code} ({name})" for code, name in SUPPORTED_LANGUAGES.items())
@@ -34,15 +55,13 @@ def transcribe_audio(filepath: str, language_code: Optional[str] = None) -> str:
         raise ValueError(f"Unsupported language code. Use one of: {valid_languages}")
 
     try:
-        transcription_options = {
-            "fp16": False,  # Use FP32 on CPU
-            "temperature": 0.0  # Disable randomness in decoding for consistent results
-        }
-        if language_code and language_code != "auto":
-            transcription_options["language"] = language_code
-
-        result = model.transcribe(filepath, **transcription_options)
-        transcript = result["text"].strip()
+        segments, _ = _load_whisper_model().transcribe(
+            audio,
+            language=language_code if language_code and language_code != "auto" else None,
+            temperature=0.0,  # Disable randomness in decoding for consistent results
+            vad_filter=True,  # Skip silent regions before decoding
+        )
+        transcript = "".join(segment.text for segment in segments).strip()
 
         if not transcript:
             raise ValueError("No speech detected in the audio")
@@ -1,23 +1,76 @@
+import io
 import os
+import threading
 import time
-from datetime import datetime
+import warnings
+import numpy as np
+import librosa
+import soundfile
+import soxr
+import av
 
 UPLOAD_FOLDER = "uploads"
+SAMPLE_RATE = 16000  # Whisper's native rate; enough bandwidth for prosody features
 
-def save_audio(file) -> str:
+def load_audio(filepath: str, sr: int = SAMPLE_RATE) -> np.ndarray:
     """
-    Save uploaded audio file to UPLOAD_FOLDER with a timestamp.
+    Decode an audio file once to a mono float32 array at the given sample rate,
+    so it can be shared by transcription and prosody analysis.
+    
+    Args:
+        filepath (str): Path to the audio file
+        sr (int): Target sample rate
+    
+    Returns:
+        np.ndarray: Mono audio samples
+    """
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        y, _ = librosa.load(filepath, sr=sr, mono=True, res_type="soxr_hq")
+    return y.astype(np.float32, copy=False)
+
+def _decode_with_av(data: bytes, sr: int) -> np.ndarray:
+    """
+    Decode compressed audio (e.g. browser webm/ogg) with PyAV, resampled to mono at sr.
+    """
+    resampler = av.AudioResampler(format="flt", layout="mono", rate=sr)
+    chunks = []
+    with av.open(io.BytesIO(data)) as container:
+        for frame in container.decode(audio=0):
+            for resampled in resampler.resample(frame):
+                chunks.append(resampled.to_ndarray().reshape(-1))
+        for resampled in resampler.resample(None):  # Flush buffered samples
+            chunks.append(resampled.to_ndarray().reshape(-1))
+    return np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.float32)
+
+def decode_audio(file, sr: int = SAMPLE_RATE) -> np.ndarray:
+    """
+    Decode an uploaded audio file in memory to a mono float32 array, without
+    writing it to disk.
     
     Args:
         file: File object from request.files
+        sr (int): Target sample rate
     
     Returns:
-        str: Path to saved audio file
+        np.ndarray: Mono audio samples
+    
+    Raises:
+        ValueError: If the audio cannot be decoded
     """
-    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-    filepath = os.path.join(UPLOAD_FOLDER, f"journal_{timestamp}.wav")
-    file.save(filepath)
-    return filepath
+    data = file.read()
+    try:
+        y, file_sr = soundfile.read(io.BytesIO(data), dtype="float32", always_2d=True)
+        y = y.mean(axis=1)
+        if file_sr != sr:
+            y = soxr.resample(y, file_sr, sr, quality="HQ")
+    except Exception:
+        # Not a container libsndfile understands; fall back to ffmpeg via PyAV
+        try:
+            y = _decode_with_av(data, sr)
+        except Exception as e:
+            raise ValueError(f"Could not decode audio: {e}")
+    return y.astype(np.float32, copy=False)
 
 def cleanup_old_files(folder: str = UPLOAD_FOLDER, hours: int = 24):
     """
@@ -30,13 +83,29 @@ def cleanup_old_files(folder: str = UPLOAD_FOLDER, hours: int = 24):
     now = time.time()
     cutoff = now - (hours * 3600)
 
-    for filename in os.listdir(folder):
-        file_path = os.path.join(folder, filename)
-        if os.path.isfile(file_path):
-            file_mtime = os.path.getmtime(file_path)
-            if file_mtime < cutoff:
+    # scandir yields type info with the listing, so only one stat per file
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
                 try:
-                    os.remove(file_path)
-                    print(f"Deleted old file: {file_path}")
+                    os.remove(entry.path)
+                    print(f"Deleted old file: {entry.path}")
                 except Exception as e:
-                    print(f"Failed to delete {file_path}: {e}")
+                    print(f"Failed to delete {entry.path}: {e}")
+
+def cleanup_old_files_in_background(folder: str = UPLOAD_FOLDER, hours: int = 24) -> threading.Thread:
+    """
+    Run cleanup_old_files on a daemon thread so startup is not blocked by the sweep.
+    
+    Args:
+        folder (str): Path to folder to clean up
+        hours (int): Age of files in hours to delete
+    
+    Returns:
+        threading.Thread: The started cleanup thread
+    """
+    thread = threading.Thread(
+        target=cleanup_old_files, args=(folder, hours), name="upload-cleanup", daemon=True
+    )
+    thread.start()
+    return thread
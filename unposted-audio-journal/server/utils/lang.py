@@ -0,0 +1,99 @@
+import hashlib
+import os
+import tempfile
+import threading
+import time
+import urllib.request
+from functools import lru_cache
+
+import fasttext
+
+SUPPORTED_LANGUAGES = {"en": "English", "hi": "Hindi"}
+LID_MODEL_URL = "https://dl.fbaipublicfiles.com/fasttext/supervised-models/lid.176.ftz"
+LID_MODEL_PATH = os.environ.get(
+    "LID_MODEL_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "models", "fasttext", "lid.176.ftz"),
+)
+LID_MODEL_SHA256 = "8f3472cfe8738a7b6099e8e999c3cbfae0dcd15696aac7d7738a8039db603e83"
+LID_DOWNLOAD_TIMEOUT = 30  # Seconds without data before the download gives up
+LID_RETRY_INTERVAL = 600  # Seconds to wait before retrying after a failed load
+LID_SAMPLE_LENGTH = 128  # Characters used for detection (and as the cache key)
+
+_lid_model = None
+_lid_failed_at = None
+_lid_lock = threading.Lock()
+
+def _download_lid_model():
+    """
+    Download the fastText model and verify its SHA-256. The file is written to a
+    temp file and moved into place, so an interrupted or corrupt download never
+    leaves a model behind.
+    """
+    print("Downloading language identification model...")
+    model_dir = os.path.dirname(LID_MODEL_PATH)
+    os.makedirs(model_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(suffix=".part", dir=model_dir)
+    try:
+        digest = hashlib.sha256()
+        with os.fdopen(fd, "wb") as out, urllib.request.urlopen(
+            LID_MODEL_URL, timeout=LID_DOWNLOAD_TIMEOUT
+        ) as response:
+            while chunk := response.read(1 << 16):
+                digest.update(chunk)
+                out.write(chunk)
+        if digest.hexdigest() != LID_MODEL_SHA256:
+            raise ValueError("Language identification model failed checksum verification")
+        os.replace(tmp_path, LID_MODEL_PATH)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def _load_lid_model():
+    """
+    Lazily load the fastText language identification model, downloading it on first use.
+    After a failure, loading is not retried for LID_RETRY_INTERVAL seconds so an
+    offline host does not attempt the download on every request.
+    """
+    global _lid_model, _lid_failed_at
+    with _lid_lock:
+        if _lid_model is None:
+            if _lid_failed_at is not None and time.monotonic() - _lid_failed_at < LID_RETRY_INTERVAL:
+                raise RuntimeError("Language identification model is unavailable")
+            try:
+                if not os.path.exists(LID_MODEL_PATH):
+                    _download_lid_model()
+                try:
+                    _lid_model = fasttext.load_model(LID_MODEL_PATH)
+                except Exception:
+                    # Unreadable file (e.g. from an older unverified download); fetch it again next time
+                    os.remove(LID_MODEL_PATH)
+                    raise
+            except Exception:
+                _lid_failed_at = time.monotonic()
+                raise
+    return _lid_model
+
+@lru_cache(maxsize=1024)
+def _detect_sample(sample: str) -> str:
+    labels, _ = _load_lid_model().predict(sample)
+    code = labels[0].split("__")[-1]
+    return code if code in SUPPORTED_LANGUAGES else "en"
+
+def detect_language(text: str) -> str:
+    """
+    Detect the language of the text with fallback to English.
+
+    Args:
+        text (str): Input text to analyze.
+
+    Returns:
+        str: Language code ('en', 'hi') or 'en' as default.
+    """
+    if not text or not isinstance(text, str):
+        return "en"
+
+    try:
+        # fastText predicts on a single line
+        return _detect_sample(text[:LID_SAMPLE_LENGTH].replace("\n", " "))
+    except Exception:
+        return "en"